@@ -0,0 +1,82 @@
+"""Startup benchmark: per-module import time and app time-to-first-frame.
+
+Each measurement runs in a fresh interpreter so module caches don't hide cost.
+
+    python bench_startup.py            # 5 runs, compare against the target
+    python bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Time from main.py's first line to the first rendered frame
+TARGET_TTFF_MS = 1500
+
+IMPORT_MODULES = [
+    "dearpygui.dearpygui",
+    "data_manager",
+    "log_setup",
+    "diagnostics",
+    "recorder",
+    "bleak",
+    "polar_python",
+]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(module):
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_startup():
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "main.py", "--benchmark-startup"], cwd=HERE, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    for line in result.stdout.splitlines():
+        if line.startswith("{"):
+            return json.loads(line)["time_to_first_frame_ms"], wall_ms
+    raise RuntimeError(f"App did not report a first frame:\n{result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print("Import time (ms, fresh interpreter):")
+    for module in IMPORT_MODULES:
+        ms = measure_import(module)
+        print(f"  {module:<22} {'not installed' if ms is None else f'{ms:8.1f}'}")
+
+    ttffs = []
+    walls = []
+    for _ in range(args.runs):
+        ttff, wall = measure_startup()
+        ttffs.append(ttff)
+        walls.append(wall)
+
+    median_ttff = statistics.median(ttffs)
+    print(f"\nTime to first frame: median {median_ttff:.0f} ms "
+          f"(min {min(ttffs):.0f}, max {max(ttffs):.0f}) over {args.runs} runs")
+    print(f"Process wall time incl. interpreter and shutdown: median {statistics.median(walls):.0f} ms")
+    print(f"Target: {TARGET_TTFF_MS} ms -> {'PASS' if median_ttff <= TARGET_TTFF_MS else 'FAIL'}")
+    return 0 if median_ttff <= TARGET_TTFF_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,70 @@
+import gzip
 import json
+import logging
+import lzma
 import os
+import shutil
+import threading
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# Compression for closed segments: name -> (file suffix, opener)
+COMPRESSORS = {
+    "gzip": (".gz", gzip.open),
+    "lzma": (".xz", lzma.open),
+}
+
+def open_session_file(path):
+    """Loads a session/segment JSON file, transparently decompressing .gz/.xz."""
+    for suffix, opener in COMPRESSORS.values():
+        if path.endswith(suffix):
+            with opener(path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def resolve_segment_path(path):
+    """Returns the on-disk path of a segment, which may since have been compressed."""
+    if os.path.exists(path):
+        return path
+    for suffix, _ in COMPRESSORS.values():
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
 class DataManager:
-    def __init__(self, output_dir="data"):
+    """Buffers samples/markers and saves them to session files.
+
+    Long sessions are split into segments: once the current segment covers
+    `segment_max_sec` of data or reaches `segment_max_bytes` on disk, a new
+    segment file is started and the closed one is compressed on a background
+    thread. A manifest (`..._manifest.json`) lists the segments of a session;
+    pass it to SessionReader to read them as one stream.
+    """
+
+    def __init__(self, output_dir="data", segment_max_sec=3600, segment_max_bytes=20 * 1024 * 1024,
+                 compression="gzip"):
         self.output_dir = output_dir
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         self.current_filename = None
+        self.last_saved_filename = None  # segment written by the latest save
         self.data_buffer = []
+        self.marker_buffer = []
+        self.data_count = 0  # data points added to the current segment (saved + buffered)
+
+        # Segment rollover
+        self.segment_max_sec = segment_max_sec
+        self.segment_max_bytes = segment_max_bytes
+        self.compression = compression if compression in COMPRESSORS else None
+        self.session_base = None
+        self.manifest_filename = None
+        self.segments = []
+        self.compress_threads = []
+
+        # Last known battery/device status, written with each save
+        self.device_status = {}
 
         # Metadata fields
         self.subject_id = "unknown"
@@ -33,34 +89,94 @@ class DataManager:
         if not safe_subject_id:
             safe_subject_id = "unknown"
             
-        filename = f"sub-{safe_subject_id}_date-{date_str}_time-{time_str}.json"
-        self.current_filename = os.path.join(self.output_dir, filename)
+        filename = f"sub-{safe_subject_id}_date-{date_str}_time-{time_str}"
+        self.session_base = os.path.join(self.output_dir, filename)
+        self.manifest_filename = self.session_base + "_manifest.json"
+        self.segments = []
+        self.last_saved_filename = None
+        self.data_count = 0
+        self.marker_buffer = []
+        self._start_segment()
         return self.current_filename
 
-    def add_data_point(self, timestamp, hr):
-        """Adds a data point to the buffer."""
+    def session_path(self):
+        """Path to report for the session: the manifest once it spans several segments.
+
+        After a rollover `current_filename` names a segment that may not be
+        written yet, so it is never reported directly.
+        """
+        if len(self.segments) > 1:
+            return self.manifest_filename
+        return self.last_saved_filename
+
+    def _start_segment(self):
+        index = len(self.segments) + 1
+        # The first segment keeps the plain session name so short sessions look as before
+        suffix = ".json" if index == 1 else f"_seg-{index:03d}.json"
+        self.current_filename = self.session_base + suffix
+        self.segments.append({
+            "index": index,
+            "file": os.path.basename(self.current_filename),
+            "start": None,
+            "end": None,
+            "count": 0,
+            "compression": None
+        })
+
+    def add_data_point(self, timestamp, hr, quality=None, flags=None, rr=None):
+        """Adds a data point to the buffer, with its signal quality and RR intervals if available."""
         iso_time = datetime.fromtimestamp(timestamp).isoformat()
-        self.data_buffer.append({
+        point = {
             "timestamp": timestamp,
             "datetime": iso_time,
             "hr": hr
-        })
+        }
+        if quality is not None:
+            point["quality"] = quality
+            point["flags"] = flags or []
+        if rr is not None:
+            point["rr"] = rr
+        self.data_buffer.append(point)
+        self.data_count += 1
+
+    def add_marker(self, timestamp, label, source="ui"):
+        """Adds an event marker to the buffer.
+
+        `index` is the position in `data` of the first sample at or after the
+        marker, so readers can slice from it without searching.
+        """
+        marker = {
+            "timestamp": timestamp,
+            "datetime": datetime.fromtimestamp(timestamp).isoformat(),
+            "label": label,
+            "source": source,
+            "index": self.data_count
+        }
+        self.marker_buffer.append(marker)
+        return marker
 
     def save_buffer(self):
         if not self.current_filename:
             return
 
+        # Take the buffers before the (possibly slow) dump: markers from the UI
+        # thread and new samples that arrive meanwhile go into the next save
+        data, self.data_buffer = self.data_buffer, []
+        markers, self.marker_buffer = self.marker_buffer, []
+
         date_str = self.start_datetime.strftime("%Y-%m-%d")
         time_str = self.start_datetime.strftime("%H:%M:%S")
 
         data_structure = {
             "subject": self.subject_id,
+            "segment": len(self.segments),
             "date": date_str,
             "time": time_str,
             "sampling_interval_sec": self.sampling_interval,
             "device_name": getattr(self, "device_name", None),
             "device_address": getattr(self, "device_address", None),
-            "data": []
+            "data": [],
+            "markers": []
         }
 
         if os.path.exists(self.current_filename):
@@ -71,9 +187,76 @@ class DataManager:
             except json.JSONDecodeError:
                 pass 
         
-        data_structure["data"].extend(self.data_buffer)
+        data_structure["data"].extend(data)
+        if self.device_status:
+            data_structure["device_status"] = self.device_status
+        data_structure.setdefault("markers", []).extend(markers)
         
         with open(self.current_filename, 'w') as f:
             json.dump(data_structure, f, indent=2)
-            
-        self.data_buffer = [] # Clear buffer after save
+        self.last_saved_filename = self.current_filename
+
+        segment = self.segments[-1]
+        if data:
+            if segment["start"] is None:
+                segment["start"] = data[0]["timestamp"]
+            segment["end"] = data[-1]["timestamp"]
+            segment["count"] += len(data)
+
+        self._maybe_rollover()
+        self._write_manifest()
+
+    def _maybe_rollover(self):
+        segment = self.segments[-1]
+        if segment["start"] is None:
+            return
+        too_long = self.segment_max_sec and segment["end"] - segment["start"] >= self.segment_max_sec
+        too_big = self.segment_max_bytes and os.path.getsize(self.current_filename) >= self.segment_max_bytes
+        if not (too_long or too_big):
+            return
+
+        closed_filename = self.current_filename
+        if self.compression:
+            segment["compression"] = self.compression
+            thread = threading.Thread(target=self._compress_segment, args=(closed_filename, self.compression))
+            thread.start()
+            self.compress_threads = [t for t in self.compress_threads if t.is_alive()] + [thread]
+        self._start_segment()
+        # Samples and markers buffered during the save belong to the new segment
+        self.data_count = max(self.data_count - segment["count"], 0)
+        for marker in self.marker_buffer:
+            marker["index"] = max(marker["index"] - segment["count"], 0)
+        logger.info(f"Segment rollover: {os.path.basename(closed_filename)} -> {os.path.basename(self.current_filename)}")
+
+    @staticmethod
+    def _compress_segment(path, compression):
+        """Compresses a closed segment; the plain file is removed only once the archive is complete."""
+        suffix, opener = COMPRESSORS[compression]
+        tmp_path = path + suffix + ".tmp"
+        try:
+            with open(path, 'rb') as f_in, opener(tmp_path, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.replace(tmp_path, path + suffix)
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Failed to compress segment {path}: {e}")
+
+    def _write_manifest(self):
+        manifest = {
+            "subject": self.subject_id,
+            "date": self.start_datetime.strftime("%Y-%m-%d"),
+            "time": self.start_datetime.strftime("%H:%M:%S"),
+            "sampling_interval_sec": self.sampling_interval,
+            "device_name": getattr(self, "device_name", None),
+            "device_address": getattr(self, "device_address", None),
+            "segments": self.segments
+        }
+        tmp_path = self.manifest_filename + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_filename)
+
+    def wait_for_compression(self):
+        for thread in self.compress_threads:
+            thread.join()
+        self.compress_threads = []
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from log_setup import RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+class DeviceStatusService:
+    """Single scheduler for battery/device status of all connected recorders.
+
+    - Battery Level notifications are used where the device supports them;
+      polling then only runs every `max_interval` as a sanity check.
+    - Otherwise the battery is polled adaptively: the interval doubles while
+      the level is unchanged (up to `max_interval`) and resets on change.
+    - Devices that are disconnected or busy (e.g. reconnecting) are skipped.
+    - Reads are done one at a time from one task, so they never pile up.
+
+    The last known status is cached for the UI and session metadata.
+    """
+
+    def __init__(self, min_interval=60, max_interval=600, tick=1.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.tick = tick
+        self.devices = {}
+        self.running = False
+
+    def register(self, recorder, is_busy=None):
+        """Adds a PolarRecorder; `is_busy()` returning True pauses reads (e.g. during reconnects)."""
+        self.devices[recorder] = {
+            "is_busy": is_busy or (lambda: False),
+            "notify": None,  # None = not tried on this connection
+            "interval": self.min_interval,
+            "next_poll": 0,
+            "status": {},
+        }
+
+    def unregister(self, recorder):
+        self.devices.pop(recorder, None)
+
+    def get_status(self, recorder):
+        device = self.devices.get(recorder)
+        return dict(device["status"]) if device else {}
+
+    def _update(self, recorder, level, source):
+        device = self.devices.get(recorder)
+        if device is None or level is None:
+            return
+        previous = device["status"].get("battery_level")
+        if level == previous:
+            device["interval"] = min(device["interval"] * 2, self.max_interval)
+        else:
+            device["interval"] = self.min_interval
+        device["status"] = {
+            "battery_level": level,
+            "battery_source": source,
+            "updated": time.time(),
+            "device_name": recorder.connected_name,
+            "device_address": recorder.connected_address,
+        }
+
+    async def run(self):
+        self.running = True
+        while self.running:
+            for recorder, device in list(self.devices.items()):
+                if not recorder.is_connected or device["is_busy"]():
+                    # Subscriptions don't survive a reconnect
+                    device["notify"] = None
+                    continue
+                try:
+                    if device["notify"] is None:
+                        device["notify"] = await recorder.start_battery_notify(
+                            lambda level, r=recorder: self._update(r, level, "notify")
+                        )
+                        device["next_poll"] = 0  # initial reading either way
+                    if time.monotonic() >= device["next_poll"]:
+                        level = await recorder.get_battery_level()
+                        self._update(recorder, level, "poll")
+                        interval = self.max_interval if device["notify"] else device["interval"]
+                        device["next_poll"] = time.monotonic() + interval
+                except Exception as e:
+                    logger.warning(f"Device status check failed: {e}", extra=RATE_LIMITED)
+            await asyncio.sleep(self.tick)
+
+    def stop(self):
+        self.running = False
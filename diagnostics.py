@@ -0,0 +1,208 @@
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Diagnostics:
+    """Opt-in runtime diagnostics that can be toggled on the running app.
+
+    - cProfile sampling for a fixed number of seconds
+    - tracemalloc snapshots, each diffed against the previous one
+    - per-frame timeline written as Chrome trace JSON (chrome://tracing, Perfetto),
+      including the time spent in each asyncio callback (BLE notifications,
+      background tasks), named after the task or callback that ran
+    """
+
+    MAX_TRACE_EVENTS = 500000  # caps memory for long captures (~100 MB of events)
+
+    def __init__(self, output_dir):
+        self.output_dir = os.path.join(output_dir, "diagnostics")
+        self.profiler = None
+        self.profile_until = 0
+        self.profile_request = None  # seconds, set from UI callbacks and started by tick()
+        self.last_snapshot = None
+        self.trace_events = None
+        self.trace_start = 0
+        self.pid = os.getpid()
+        self.original_handle_run = None
+
+    def _path(self, prefix, ext):
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.output_dir, f"{prefix}_{stamp}.{ext}")
+
+    # --- cProfile ---
+
+    @property
+    def is_profiling(self):
+        return self.profiler is not None or self.profile_request is not None
+
+    def start_profile(self, seconds=30):
+        """Profiles the main (GUI + asyncio) thread for `seconds`."""
+        if self.profiler is not None:
+            return
+        self.profiler = cProfile.Profile()
+        self.profile_until = time.time() + seconds
+        self.profiler.enable()
+        logger.info(f"cProfile started for {seconds}s")
+
+    def request_profile(self, seconds=30):
+        """Starts a profile from any thread; the next tick() enables it on the main thread.
+
+        cProfile only sees the thread that enables it, and DearPyGui runs UI
+        callbacks on its own thread.
+        """
+        self.profile_request = seconds
+
+    def stop_profile(self):
+        """Stops profiling and writes .prof and text summaries. Returns the .prof path."""
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+        prof_path = self._path("profile", "prof")
+        self.profiler.dump_stats(prof_path)
+        with open(prof_path[:-len("prof")] + "txt", 'w') as f:
+            stats = pstats.Stats(self.profiler, stream=f)
+            stats.sort_stats("cumulative").print_stats(50)
+        self.profiler = None
+        logger.info(f"cProfile written to {prof_path}")
+        return prof_path
+
+    # --- tracemalloc ---
+
+    def take_snapshot(self, sizes=None):
+        """Takes a tracemalloc snapshot and writes the diff against the previous one.
+
+        The first call only starts tracing and records a baseline. `sizes` is an
+        optional dict of container lengths (e.g. plot_data_x) logged alongside.
+        Returns the report path, or None for the baseline call.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self.last_snapshot = tracemalloc.take_snapshot()
+            logger.info("tracemalloc started, baseline snapshot taken")
+            return None
+
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        report_path = self._path("memory", "txt")
+        with open(report_path, 'w') as f:
+            f.write(f"Traced memory: current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB\n")
+            for name, size in (sizes or {}).items():
+                f.write(f"{name}: {size}\n")
+            f.write("\nTop growth since previous snapshot:\n")
+            for stat in snapshot.compare_to(self.last_snapshot, "lineno")[:25]:
+                f.write(f"{stat}\n")
+            f.write("\nTop allocations:\n")
+            for stat in snapshot.statistics("lineno")[:25]:
+                f.write(f"{stat}\n")
+        self.last_snapshot = snapshot
+        logger.info(f"tracemalloc diff written to {report_path}")
+        return report_path
+
+    def stop_tracemalloc(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.last_snapshot = None
+
+    # --- Frame timeline ---
+
+    @property
+    def is_tracing(self):
+        return self.trace_events is not None
+
+    def start_trace(self):
+        if self.trace_events is None:
+            self.trace_events = []
+            self.trace_start = time.perf_counter()
+            self._install_asyncio_hook()
+            logger.info("Frame timeline capture started")
+
+    def stop_trace(self):
+        """Writes the captured timeline as Chrome trace JSON. Returns the path."""
+        if self.trace_events is None:
+            return None
+        self._remove_asyncio_hook()
+        trace_path = self._path("trace", "json")
+        with open(trace_path, 'w') as f:
+            json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "ms"}, f)
+        self.trace_events = None
+        logger.info(f"Frame timeline written to {trace_path}")
+        return trace_path
+
+    def _add_event(self, name, start, end, category="frame"):
+        if self.trace_events is not None and len(self.trace_events) < self.MAX_TRACE_EVENTS:
+            self.trace_events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self.trace_start) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": self.pid,
+                "tid": 0,
+            })
+
+    @contextmanager
+    def span(self, name):
+        """Records the duration of the enclosed block as a complete ("X") trace event."""
+        if self.trace_events is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_event(name, start, time.perf_counter())
+
+    @staticmethod
+    def _handle_name(handle):
+        callback = handle._callback
+        owner = getattr(callback, "__self__", None)
+        if isinstance(owner, asyncio.Task):
+            coro = owner.get_coro()
+            return f"asyncio: {getattr(coro, '__qualname__', owner.get_name())}"
+        return f"asyncio: {getattr(callback, '__qualname__', repr(callback))}"
+
+    def _install_asyncio_hook(self):
+        """Times every event-loop callback (Handle._run) while the timeline is captured."""
+        if self.original_handle_run is not None:
+            return
+        original = asyncio.events.Handle._run
+        diagnostics = self
+
+        def timed_run(handle):
+            start = time.perf_counter()
+            try:
+                return original(handle)
+            finally:
+                diagnostics._add_event(diagnostics._handle_name(handle), start, time.perf_counter(), "asyncio")
+
+        self.original_handle_run = original
+        asyncio.events.Handle._run = timed_run
+
+    def _remove_asyncio_hook(self):
+        if self.original_handle_run is not None:
+            asyncio.events.Handle._run = self.original_handle_run
+            self.original_handle_run = None
+
+    def tick(self):
+        """Called once per frame on the main thread; starts requested and ends timed cProfile runs."""
+        if self.profile_request is not None:
+            seconds, self.profile_request = self.profile_request, None
+            self.start_profile(seconds)
+        elif self.profiler is not None and time.time() >= self.profile_until:
+            self.stop_profile()
+
+    def shutdown(self):
+        self.stop_profile()
+        self.stop_trace()
+        self.stop_tracemalloc()
@@ -0,0 +1,165 @@
+import atexit
+import copy
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import time
+
+# Fields attached to every log record (device address, session file, ...).
+# Updated from the UI thread via set_log_context().
+_log_context = {}
+
+def set_log_context(**fields):
+    """Sets (or clears, with None) structured fields added to every log record."""
+    for key, value in fields.items():
+        if value is None:
+            _log_context.pop(key, None)
+        else:
+            _log_context[key] = value
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current log context onto the record so it survives the queue hop."""
+
+    def filter(self, record):
+        record.context = dict(_log_context)
+        return True
+
+
+# Pass as `extra=RATE_LIMITED` on noisy call sites (e.g. battery reads during disconnects)
+RATE_LIMITED = {"rate_limit": True}
+
+
+class RateLimitFilter(logging.Filter):
+    """Suppresses repeats from opted-in call sites within `interval` seconds.
+
+    Only records logged with `extra=RATE_LIMITED` are limited; everything else
+    passes. The first message from a call site is always emitted. Once the
+    interval has passed, the next one carries a count of what was dropped;
+    counts still pending at exit are logged by flush().
+    """
+
+    def __init__(self, interval=60.0):
+        super().__init__()
+        self.interval = interval
+        self.sites = {}  # (pathname, lineno) -> [last_emit_time, suppressed_count, last_record]
+
+    def filter(self, record):
+        if not getattr(record, "rate_limit", False):
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        site = self.sites.get(key)
+        if site is None:
+            self.sites[key] = [now, 0, None]
+            return True
+        if now - site[0] < self.interval:
+            site[1] += 1
+            site[2] = record
+            return False
+        if site[1]:
+            record.msg = f"{record.msg} (suppressed {site[1]} similar messages)"
+        site[0] = now
+        site[1] = 0
+        site[2] = None
+        return True
+
+    def flush(self):
+        """Logs a summary for call sites that still have suppressed messages."""
+        for site in self.sites.values():
+            if site[1]:
+                last = site[2]
+                logging.getLogger(last.name).log(
+                    last.levelno, f"Suppressed {site[1]} similar messages, last: {last.getMessage()}"
+                )
+                site[1] = 0
+                site[2] = None
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback apart from the message.
+
+    The stock prepare() folds the traceback into `msg`; here it is rendered to
+    `exc_text` instead so formatters can emit it as its own field.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the structured context merged in."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", {}))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry)
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def setup_logging(log_file, level=logging.INFO, max_bytes=5 * 1024 * 1024, backup_count=5):
+    """Routes all logging through a queue to a background listener thread.
+
+    Callers (the asyncio/GUI thread) only enqueue records; formatting, disk
+    writes, size-based rotation and gzip compression of rotated files happen
+    on the listener thread. Returns the started QueueListener.
+    """
+    file_handler = logging.handlers.RotatingFileHandler(
+        str(log_file), maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    file_handler.namer = _gzip_namer
+    file_handler.rotator = _gzip_rotator
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+
+    # Windowed PyInstaller builds have no console
+    if sys.stderr is not None:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    rate_limit = RateLimitFilter()
+    queue_handler.addFilter(rate_limit)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # atexit runs in reverse order: flush pending suppression counts, then stop
+    atexit.register(listener.stop)
+    atexit.register(rate_limit.flush)
+    return listener
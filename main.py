@@ -1,14 +1,23 @@
+import time
+STARTUP_T0 = time.perf_counter()  # reference point for time-to-first-frame
+
 import dearpygui.dearpygui as dpg
 import threading
-import time
 import asyncio
 import os
+import json
 from data_manager import DataManager
-from recorder import PolarRecorder
+from recorder import PolarRecorder, preload_ble_modules
+from diagnostics import Diagnostics
+from log_setup import setup_logging, set_log_context
+from signal_quality import SignalQuality
+from marker_server import MarkerServer, DEFAULT_MARKER_PORT
+from device_status import DeviceStatusService
+from replay import ReplayRecorder, REPLAY_ADDRESS
 from version import __version__
 import queue
-import logging
-
+import argparse
+from collections import deque
 import logging
 from pathlib import Path
 
@@ -22,20 +31,40 @@ def get_app_data_path():
 APP_DATA_PATH = get_app_data_path()
 LOG_FILE = APP_DATA_PATH / "hrrecorder.log"
 
-# Configure logging to file in the standard directory
-logging.basicConfig(
-    filename=str(LOG_FILE),
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Configure non-blocking, rotating JSON logging in the standard directory
+setup_logging(LOG_FILE)
 logger = logging.getLogger(__name__)
 
 class HRRecorderApp:
-    def __init__(self):
-        self.data_manager = DataManager(output_dir=str(APP_DATA_PATH))
-        self.recorder = PolarRecorder()
+    def __init__(self, profile_seconds=None, benchmark_startup=False, marker_port=DEFAULT_MARKER_PORT,
+                 segment_minutes=60, segment_mb=20, segment_compression="gzip",
+                 continuous_capture=True, pretrigger_minutes=2, replay_path=None, replay_speed=1.0,
+                 replay_original_timestamps=False, replay_autostart=False):
+        self.data_manager = DataManager(
+            output_dir=str(APP_DATA_PATH),
+            segment_max_sec=segment_minutes * 60,
+            segment_max_bytes=int(segment_mb * 1024 * 1024),
+            compression=segment_compression,
+        )
+        if replay_path:
+            self.recorder = ReplayRecorder(replay_path, speed=replay_speed,
+                                           original_timestamps=replay_original_timestamps)
+        else:
+            self.recorder = PolarRecorder()
+        self.diagnostics = Diagnostics(output_dir=str(APP_DATA_PATH))
+        self.signal_quality = SignalQuality()
+        self.interval_quality = 1.0  # worst sample quality since the last stored point
+        self.interval_flags = set()
+        self.interval_rr = []  # ectopic-corrected RR intervals (ms) since the last stored point
+        self.marker_server = MarkerServer(self.add_marker, port=marker_port) if marker_port else None
+        self.marker_label = "stimulus"
+        self.marker_count = 0
+        self.profile_seconds = profile_seconds
+        self.benchmark_startup = benchmark_startup
+        self.first_frame_done = False
         
         self.is_recording = False
+        self.start_requested = False  # set by the UI thread, handled by update_plot
         self.subject_id = "test"
         self.sampling_interval = 10
         self.last_sample_time = 0
@@ -45,10 +74,25 @@ class HRRecorderApp:
         self.discovered_devices = []
         self.busy_devices = set()  # local soft-locks to avoid double pick in same app
         self.battery_level = None
-        self.last_battery_check = 0
+        self.device_status = DeviceStatusService()
+        self.device_status.register(self.recorder, is_busy=lambda: self.is_reconnecting)
         self.last_data_time = 0
         self.is_reconnecting = False
         self.watchdog_interval = 20 # seconds to wait before assuming connection lost during recording
+
+        # Continuous capture: stream whenever connected and keep the last
+        # `pretrigger_minutes` of samples so a late "Start Recording" loses nothing
+        self.continuous_capture = continuous_capture
+        self.pretrigger_minutes = pretrigger_minutes
+        self.pretrigger_buffer = deque()  # (timestamp, hr, quality, flags, rr)
+
+        # Replay: a recorded session stands in for the device
+        self.replay_path = replay_path
+        self.replay_autostart = replay_autostart
+        self.replay_started = False
+        if replay_path:
+            self.selected_device_name = self.recorder.device_name
+            self.selected_device_address = REPLAY_ADDRESS
         
 
 
@@ -68,10 +112,19 @@ class HRRecorderApp:
         dpg.create_viewport(title='HR Recorder', width=800, height=750)
         
         with dpg.window(tag="Primary Window"):
+            with dpg.menu_bar():
+                with dpg.menu(label="Diagnostics"):
+                    dpg.add_menu_item(label="Profile CPU (30 s)", callback=self.start_cpu_profile)
+                    dpg.add_menu_item(label="Memory Snapshot / Diff", callback=self.take_memory_snapshot)
+                    dpg.add_menu_item(label="Start Frame Timeline", callback=self.toggle_frame_trace,
+                                      tag="trace_menu_item")
+
             with dpg.group(horizontal=True):
                 dpg.add_text("Polar Device Connection")
                 dpg.add_spacer(width=200)
                 dpg.add_text("Battery: --%", tag="battery_text", color=(0, 255, 0))
+                dpg.add_spacer(width=20)
+                dpg.add_text("Signal: --", tag="quality_text", color=(200, 200, 200))
             
             dpg.add_input_text(label="Subject ID", default_value="test", callback=self.update_subject_id)
 
@@ -95,6 +148,9 @@ class HRRecorderApp:
             
             dpg.add_input_int(label="Sampling (sec)", default_value=10, 
                               callback=self.update_sampling, tag="sampling_input", min_value=1)
+            dpg.add_input_int(label="Pre-trigger (min)", default_value=self.pretrigger_minutes,
+                              callback=self.update_pretrigger, tag="pretrigger_input", min_value=0,
+                              min_clamped=True, show=self.continuous_capture)
 
             dpg.add_text("Heart Rate Monitor")
             with dpg.plot(label="Live Heart Rate", height=300, width=-1):
@@ -104,6 +160,11 @@ class HRRecorderApp:
                 dpg.add_line_series([], [], label="HR", parent="y_axis", tag="hr_series")
 
             dpg.add_button(label="Start Recording", callback=self.toggle_recording, tag="record_btn", show=True)
+            with dpg.group(horizontal=True):
+                dpg.add_input_text(label="Marker Label", default_value=self.marker_label, width=200,
+                                   callback=self.update_marker_label)
+                dpg.add_button(label="Add Marker (F2)", callback=self.ui_add_marker, tag="marker_btn")
+                dpg.add_text("Markers: 0", tag="marker_count_text")
             dpg.add_spacer(height=10)
             dpg.add_button(label="Exit", callback=self.exit_app)
             
@@ -113,6 +174,9 @@ class HRRecorderApp:
                 dpg.add_spacer(width=-1)
                 dpg.add_text(f"v{__version__}", color=(128, 128, 128))
 
+        with dpg.handler_registry():
+            dpg.add_key_press_handler(dpg.mvKey_F2, callback=self.ui_add_marker)
+
         dpg.setup_dearpygui()
         dpg.show_viewport()
         dpg.set_primary_window("Primary Window", True)
@@ -125,9 +189,12 @@ class HRRecorderApp:
     def update_sampling(self, sender, app_data):
         self.sampling_interval = app_data
 
+    def update_pretrigger(self, sender, app_data):
+        self.pretrigger_minutes = app_data
+
     def update_device_type(self, sender, app_data):
         self.selected_device_type = app_data
-        print(f"Selected: {app_data}")
+        logger.info(f"Selected device type: {app_data}")
 
     def scan_devices(self):
         dpg.set_value("status_text", "Scanning for devices...")
@@ -183,17 +250,32 @@ class HRRecorderApp:
         dpg.configure_item("connect_btn", enabled=False)
         try:
             device_name = await self.recorder.connect_to_address(self.selected_device_address)
+            if self.replay_path:
+                # Saved sessions hold one sample per sampling interval, not one per beat.
+                # The gap threshold is raised to two intervals for the rest of the run
+                # (it's all replay) so every sample isn't flagged as a gap
+                interval = self.recorder.reader.metadata.get("sampling_interval_sec") or 0
+                self.signal_quality.gap_sec = max(self.signal_quality.gap_sec, 2 * interval)
             self.selected_device_name = device_name
             self.busy_devices.add(self.selected_device_address)
+            set_log_context(device=self.selected_device_address)
             dpg.set_value("status_text", f"Connected to: {device_name} ({self.selected_device_address})")
             dpg.hide_item("reconnect_btn")
             dpg.configure_item("connect_btn", enabled=False)
             logger.info(f"Connected to {device_name} ({self.selected_device_address})")
-            
-            if self.is_recording:
-                dpg.set_value("status_text", "Reconnected! Resuming stream...")
+
+            if self.replay_autostart and not self.replay_started and not self.is_recording:
+                # Record from the first replayed sample; at max speed the stream
+                # would otherwise run ahead into the pre-trigger buffer
+                self.replay_started = True
+                self.start_recording()
+                self.last_sample_time = 0  # store the first replayed sample
+
+            if self.is_recording or self.continuous_capture:
+                if self.is_recording:
+                    dpg.set_value("status_text", "Reconnected! Resuming stream...")
                 await self.recorder.start_hr_stream(self.handle_hr_data)
-                self.last_data_time = time.time()
+                self.last_data_time = self.recorder.now()
                 
         except Exception as e:
             logger.error(f"Connection error: {e}")
@@ -208,14 +290,16 @@ class HRRecorderApp:
 
     def check_watchdog(self):
         """Checks if data has stopped during recording and attempts recovery."""
+        if self.replay_path:
+            return  # a replay can't stall; only running out of data ends its stream
         if self.is_recording and not self.is_reconnecting:
-            current_time = time.time()
+            current_time = self.recorder.now()
             if self.last_data_time > 0 and (current_time - self.last_data_time > self.watchdog_interval):
                 self.is_reconnecting = True
                 self.loop.create_task(self.async_check_watchdog())
 
     async def async_check_watchdog(self):
-        current_gap = time.time() - self.last_data_time
+        current_gap = self.recorder.now() - self.last_data_time
         logger.warning(f"Watchdog trigger: No data for {current_gap:.1f}s")
         dpg.set_value("status_text", "Connection stalled. Reconnecting...")
         
@@ -237,54 +321,134 @@ class HRRecorderApp:
             if not self.recorder.is_connected:
                 dpg.set_value("status_text", "Error: Not connected to device.")
                 return
-
-            self.is_recording = True
-            dpg.set_item_label("record_btn", "Stop Recording")
-            
-            dpg.configure_item("sampling_input", enabled=False)
-            
-            self.data_manager.set_metadata(
-                self.subject_id,
-                self.sampling_interval,
-                device_name=self.selected_device_name,
-                device_address=self.selected_device_address,
-            )
-            filename = self.data_manager.create_filename(self.subject_id)
-            dpg.set_value("status_text", f"Recording to: {filename}")
-            
-            self.start_time = time.time()
-            self.last_sample_time = time.time()
-            self.last_save_time = time.time()
-            self.last_data_time = time.time()
-            self.plot_data_x = []
-            self.plot_data_y = []
-            self.data_manager.data_buffer = [] # Reset buffer
-            logger.info(f"Started recording for subject {self.subject_id}")
-            
-            # Start Stream
-            self.loop.create_task(
-                self.recorder.start_hr_stream(self.handle_hr_data)
-            )
+            # DearPyGui calls this on its own thread; the session is opened on the
+            # loop thread so live samples can't interleave with the pre-trigger commit
+            self.start_requested = True
         else:
             # Stop
             self.is_recording = False
             dpg.set_item_label("record_btn", "Start Recording")
             dpg.configure_item("sampling_input", enabled=True)
+            dpg.configure_item("pretrigger_input", enabled=True)
             dpg.set_value("status_text", "Recording Stopped. Saving...")
             logger.info("Stopped recording")
+            set_log_context(session=None)
             
-            self.loop.create_task(self.recorder.stop_hr_stream())
+            if not self.continuous_capture:
+                self.loop.create_task(self.recorder.stop_hr_stream())
             
             self.data_manager.save_buffer()
-            dpg.set_value("status_text", f"Saved: {self.data_manager.current_filename}")
+            dpg.set_value("status_text", f"Saved: {self.data_manager.session_path()}")
             
             # Show reconnect if disconnected
             if not self.recorder.is_connected:
                 dpg.show_item("reconnect_btn")
                 dpg.configure_item("connect_btn", enabled=True)
 
-    def handle_hr_data(self, timestamp, hr_val):
-        self.data_queue.put((timestamp, hr_val))
+    def start_recording(self):
+        """Opens a new session. Runs on the loop thread, from update_plot before it drains the queue."""
+        self.start_requested = False
+        self.is_recording = True
+        dpg.set_item_label("record_btn", "Stop Recording")
+        
+        dpg.configure_item("sampling_input", enabled=False)
+        dpg.configure_item("pretrigger_input", enabled=False)
+        
+        self.data_manager.set_metadata(
+            self.subject_id,
+            self.sampling_interval,
+            device_name=self.selected_device_name,
+            device_address=self.selected_device_address,
+        )
+        filename = self.data_manager.create_filename(self.subject_id)
+        set_log_context(subject=self.subject_id, session=os.path.basename(filename))
+        dpg.set_value("status_text", f"Recording to: {filename}")
+        
+        # Sample timestamps come from the recorder's clock (the replay clock during replays)
+        self.start_time = self.recorder.now()
+        self.last_sample_time = self.start_time
+        self.last_save_time = time.time()
+        self.last_data_time = self.start_time
+        self.plot_data_x = []
+        self.plot_data_y = []
+        self.data_manager.data_buffer = [] # Reset buffer
+        if not self.continuous_capture:
+            self.signal_quality.reset()  # otherwise quality history carries over from the capture
+        self.interval_quality = 1.0
+        self.interval_flags = set()
+        self.interval_rr = []
+        self.marker_count = 0
+        dpg.set_value("marker_count_text", "Markers: 0")
+        logger.info(f"Started recording for subject {self.subject_id}")
+
+        self.commit_pretrigger()
+        
+        # Start Stream (already running in continuous capture mode)
+        if not self.recorder.is_streaming:
+            self.loop.create_task(
+                self.recorder.start_hr_stream(self.handle_hr_data)
+            )
+
+    def commit_pretrigger(self):
+        """Moves the pre-trigger window into the new session, ahead of live samples."""
+        cutoff = self.start_time - self.pretrigger_minutes * 60
+        committed = 0
+        if self.pretrigger_buffer:
+            self.last_sample_time = 0  # store the first buffered sample
+        for ts, hr, quality, flags, rr in self.pretrigger_buffer:
+            if ts >= cutoff:
+                self.record_sample(ts, hr, quality, flags, rr)
+                committed += 1
+        self.pretrigger_buffer.clear()
+        if committed:
+            self.refresh_plot()
+            logger.info(f"Committed {committed} pre-trigger samples")
+
+    def buffer_pretrigger(self, ts, hr, quality, flags, rr):
+        self.pretrigger_buffer.append((ts, hr, quality, flags, rr))
+        cutoff = ts - self.pretrigger_minutes * 60
+        while self.pretrigger_buffer and self.pretrigger_buffer[0][0] < cutoff:
+            self.pretrigger_buffer.popleft()
+
+    def record_sample(self, ts, hr, quality, flags, rr):
+        self.interval_quality = min(self.interval_quality, quality)
+        self.interval_flags.update(flags)
+        self.interval_rr.extend(rr)
+
+        # Sampling logic: only save if enough time has passed
+        if ts - self.last_sample_time >= self.sampling_interval:
+            # RR is kept for every beat, not just the sampled one
+            self.data_manager.add_data_point(ts, hr, quality=self.interval_quality,
+                                             flags=sorted(self.interval_flags), rr=self.interval_rr)
+            self.interval_quality = 1.0
+            self.interval_flags = set()
+            self.interval_rr = []
+            self.last_sample_time = ts
+            # Periodic save every 30 seconds
+            if time.time() - self.last_save_time >= 30:
+                self.data_manager.save_buffer()
+                self.last_save_time = time.time()
+                saved = self.data_manager.last_saved_filename
+                filename = os.path.basename(saved) if saved else "unknown"
+                msg = f"Auto-saved to {filename} at {time.strftime('%H:%M:%S')}"
+                dpg.set_value("status_text", msg)
+                logger.info(msg)
+
+        if self.start_time:
+            self.plot_data_x.append(ts - self.start_time)
+            self.plot_data_y.append(hr)
+
+    def refresh_plot(self):
+        if len(self.plot_data_x) > 300:
+            dpg.set_value("hr_series", [self.plot_data_x[-300:], self.plot_data_y[-300:]])
+        else:
+            dpg.set_value("hr_series", [self.plot_data_x, self.plot_data_y])
+            
+        dpg.fit_axis_data("x_axis")
+        dpg.fit_axis_data("y_axis")
+
+    def handle_hr_data(self, timestamp, hr_val, rr_intervals=None):
+        self.data_queue.put((timestamp, hr_val, rr_intervals))
         self.last_data_time = timestamp
 
     def update_plot(self):
@@ -295,7 +459,7 @@ class HRRecorderApp:
             
         # Update total time
         if self.is_recording and self.start_time:
-            total_seconds = int(time.time() - self.start_time)
+            total_seconds = int(self.recorder.now() - self.start_time)
             hours, remainder = divmod(total_seconds, 3600)
             minutes, seconds = divmod(remainder, 60)
             dpg.set_value("total_time_text", f"Total Time: {hours:02}:{minutes:02}:{seconds:02}")
@@ -310,68 +474,161 @@ class HRRecorderApp:
                  dpg.hide_item("reconnect_btn")
                  dpg.configure_item("connect_btn", enabled=False)
 
+        if self.start_requested:
+            self.start_recording()
+
         # Process queue
+        recorded = False
+        assessed = False
         while not self.data_queue.empty():
             try:
-                ts, hr = self.data_queue.get_nowait()
+                ts, hr, rr = self.data_queue.get_nowait()
             except queue.Empty:
                 break
+
+            result = self.signal_quality.assess(ts, hr, rr)
+            assessed = True
             
             if self.is_recording:
-                # Sampling logic: only save if enough time has passed
-                if ts - self.last_sample_time >= self.sampling_interval:
-                    self.data_manager.add_data_point(ts, hr)
-                    self.last_sample_time = ts
-                    # Periodic save every 30 seconds
-                    if time.time() - self.last_save_time >= 30:
-                        self.data_manager.save_buffer()
-                        self.last_save_time = time.time()
-                        filename = os.path.basename(self.data_manager.current_filename) if self.data_manager.current_filename else "unknown"
-                        msg = f"Auto-saved to {filename} at {time.strftime('%H:%M:%S')}"
-                        dpg.set_value("status_text", msg)
-                        logger.info(msg)
-                
-                if self.start_time:
-                    rel_time = ts - self.start_time
-                    self.plot_data_x.append(rel_time)
-                    self.plot_data_y.append(hr)
-                    
-                    if len(self.plot_data_x) > 300:
-                        dpg.set_value("hr_series", [self.plot_data_x[-300:], self.plot_data_y[-300:]])
-                    else:
-                        dpg.set_value("hr_series", [self.plot_data_x, self.plot_data_y])
-                        
-                    dpg.fit_axis_data("x_axis")
-                    dpg.fit_axis_data("y_axis")
+                self.record_sample(ts, hr, result["quality"], result["flags"], result["rr"])
+                recorded = True
+            elif self.continuous_capture:
+                self.buffer_pretrigger(ts, hr, result["quality"], result["flags"], result["rr"])
+
+        if assessed:
+            self.update_quality_indicator()
+        if recorded and self.start_time:
+            self.refresh_plot()
+
+    def update_quality_indicator(self):
+        score = self.signal_quality.score
+        if score >= 0.8:
+            color = (0, 255, 0)
+        elif score >= 0.5:
+            color = (255, 200, 0)
+        else:
+            color = (255, 60, 60)
+        flags = self.signal_quality.flags
+        label = ", ".join(flags) if flags else "good"
+        dpg.set_value("quality_text", f"Signal: {score * 100:.0f}% ({label})")
+        dpg.configure_item("quality_text", color=color)
 
     async def main_loop(self):
+        span = self.diagnostics.span
         while dpg.is_dearpygui_running():
-            self.update_plot()
-            self.check_battery() 
-            self.check_watchdog() # Non-blocking now
-            dpg.render_dearpygui_frame()
+            with span("frame"):
+                with span("update_plot"):
+                    self.update_plot()
+                self.check_battery() 
+                self.check_watchdog() # Non-blocking now
+                if self.replay_path:
+                    self.check_replay()
+                with span("render_dearpygui_frame"):
+                    dpg.render_dearpygui_frame()
+                if not self.first_frame_done:
+                    self.on_first_frame()
+                self.diagnostics.tick()
+            # Asyncio callbacks that run while we yield are timed by the diagnostics loop hook
             await asyncio.sleep(0.01) # Yield to allow BLE events to process, ~100 FPS
 
+    def on_first_frame(self):
+        """Runs once the window is visible; starts loading the BLE stack in the background."""
+        self.first_frame_done = True
+        ttff_ms = (time.perf_counter() - STARTUP_T0) * 1000
+        logger.info(f"Time to first frame: {ttff_ms:.0f} ms")
+        threading.Thread(target=self.preload_ble, daemon=True).start()
+        if self.benchmark_startup:
+            print(json.dumps({"time_to_first_frame_ms": round(ttff_ms, 1)}), flush=True)
+            dpg.stop_dearpygui()
+        elif self.replay_path:
+            dpg.set_value("status_text", f"Replaying {os.path.basename(self.replay_path)}...")
+            self.loop.create_task(self.async_connect())
+
+    def check_replay(self):
+        """With --replay-autostart, stops recording once the replay is drained (it starts in async_connect)."""
+        if not self.replay_autostart:
+            return
+        if self.is_recording and self.recorder.finished and self.data_queue.empty():
+            self.toggle_recording()
+            dpg.set_value("status_text", f"Replay complete: {self.recorder.samples_sent} samples. "
+                                         f"Saved: {os.path.basename(self.data_manager.session_path())}")
+
+    def preload_ble(self):
+        start = time.perf_counter()
+        try:
+            preload_ble_modules()
+            logger.info(f"BLE modules preloaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+        except Exception as e:
+            logger.warning(f"BLE preload failed: {e}")
+
     def check_battery(self):
-        if self.recorder.is_connected:
-            current_time = time.time()
-            # Check battery every 60 seconds
-            if current_time - self.last_battery_check >= 60:
-                self.last_battery_check = current_time # Update immediately to avoid multiple tasks
-                self.loop.create_task(self.async_check_battery())
-        else:
-            if self.battery_level is not None:
-                self.battery_level = None
+        """Shows the cached battery level; reads are scheduled by DeviceStatusService."""
+        status = self.device_status.get_status(self.recorder)
+        level = status.get("battery_level") if self.recorder.is_connected else None
+        if level != self.battery_level:
+            self.battery_level = level
+            if level is None:
                 dpg.set_value("battery_text", "Battery: --%")
+            else:
+                dpg.set_value("battery_text", f"Battery: {level}%")
+                self.data_manager.device_status = status
+
+    def start_cpu_profile(self, sender=None, app_data=None):
+        if self.diagnostics.is_profiling:
+            dpg.set_value("status_text", "CPU profile already running")
+            return
+        self.diagnostics.request_profile(30)
+        dpg.set_value("status_text", "CPU profiling for 30 s...")
+
+    def take_memory_snapshot(self, sender=None, app_data=None):
+        sizes = {
+            "plot_data_x": len(self.plot_data_x),
+            "plot_data_y": len(self.plot_data_y),
+            "data_buffer": len(self.data_manager.data_buffer),
+            "data_queue": self.data_queue.qsize(),
+        }
+        report = self.diagnostics.take_snapshot(sizes)
+        if report:
+            dpg.set_value("status_text", f"Memory diff saved: {os.path.basename(report)}")
+        else:
+            dpg.set_value("status_text", "Memory tracing started (baseline taken)")
+
+    def toggle_frame_trace(self, sender=None, app_data=None):
+        if self.diagnostics.is_tracing:
+            trace_path = self.diagnostics.stop_trace()
+            dpg.set_item_label("trace_menu_item", "Start Frame Timeline")
+            dpg.set_value("status_text", f"Timeline saved: {os.path.basename(trace_path)}")
+        else:
+            self.diagnostics.start_trace()
+            dpg.set_item_label("trace_menu_item", "Stop Frame Timeline")
+            dpg.set_value("status_text", "Capturing frame timeline...")
+
+    def update_marker_label(self, sender, app_data):
+        self.marker_label = app_data
 
-    async def async_check_battery(self):
+    def ui_add_marker(self, sender=None, app_data=None):
+        self.add_marker(self.marker_label or "marker", "ui")
+
+    def add_marker(self, label, source):
+        """Timestamps a marker with the same clock as HR samples. Returns it, or None if not recording."""
+        if not self.is_recording:
+            dpg.set_value("status_text", "Markers can only be added while recording")
+            return None
+        # The recorder's clock, so markers line up with samples during accelerated replays too
+        marker = self.data_manager.add_marker(self.recorder.now(), label, source)
+        self.marker_count += 1
+        dpg.set_value("marker_count_text", f"Markers: {self.marker_count}")
+        dpg.set_value("status_text", f"Marker '{label}' at {time.strftime('%H:%M:%S', time.localtime(marker['timestamp']))}")
+        logger.info(f"Marker '{label}' from {source} at {marker['timestamp']:.3f}")
+        return marker
+
+    async def start_marker_server(self):
         try:
-            level = await self.recorder.get_battery_level()
-            if level is not None:
-                self.battery_level = level
-                dpg.set_value("battery_text", f"Battery: {self.battery_level}%")
-        except Exception as e:
-            print(f"Background battery check failed: {e}")
+            await self.marker_server.start()
+        except OSError as e:
+            # e.g. another app window already owns the port
+            logger.warning(f"Marker API unavailable on port {self.marker_server.port}: {e}")
+            self.marker_server = None
 
     def exit_app(self, sender=None, app_data=None):
         dpg.stop_dearpygui()
@@ -380,17 +637,65 @@ class HRRecorderApp:
         # Setup AsyncIO Loop (Main Thread)
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
+        if self.profile_seconds:
+            self.diagnostics.start_profile(self.profile_seconds)
+            self.diagnostics.start_trace()
+            self.diagnostics.take_snapshot()
+            dpg.set_item_label("trace_menu_item", "Stop Frame Timeline")
+        if self.marker_server:
+            self.loop.run_until_complete(self.start_marker_server())
+        status_task = self.loop.create_task(self.device_status.run())
         try:
             self.loop.run_until_complete(self.main_loop())
         except KeyboardInterrupt:
             pass
         finally:
             # Cleanup
+            self.device_status.stop()
+            status_task.cancel()
+            self.loop.run_until_complete(asyncio.gather(status_task, return_exceptions=True))
             if self.recorder.is_connected:
                  self.loop.run_until_complete(self.recorder.disconnect())
+            if self.marker_server:
+                self.loop.run_until_complete(self.marker_server.stop())
+            self.diagnostics.shutdown()
+            self.data_manager.wait_for_compression()
             dpg.destroy_context()
             self.loop.close()
 
 if __name__ == "__main__":
-    app = HRRecorderApp()
+    parser = argparse.ArgumentParser(description="HR Recorder")
+    parser.add_argument("--profile", nargs="?", type=int, const=30, default=None, metavar="SECONDS",
+                        help="Start cProfile (default 30 s), frame timeline and tracemalloc at launch")
+    parser.add_argument("--benchmark-startup", action="store_true",
+                        help="Print time-to-first-frame as JSON and exit after the first frame")
+    parser.add_argument("--marker-port", type=int, default=DEFAULT_MARKER_PORT,
+                        help="Local TCP port for the marker API (0 disables)")
+    parser.add_argument("--segment-minutes", type=float, default=60,
+                        help="Start a new segment file after this many minutes of data (0 disables)")
+    parser.add_argument("--segment-mb", type=float, default=20,
+                        help="Start a new segment file once the current one reaches this size (0 disables)")
+    parser.add_argument("--segment-compression", choices=["gzip", "lzma", "none"], default="gzip",
+                        help="Compression for closed segment files")
+    parser.add_argument("--no-continuous-capture", action="store_true",
+                        help="Only stream while recording (disables the pre-trigger buffer)")
+    parser.add_argument("--pretrigger-minutes", type=int, default=2,
+                        help="Minutes of data kept before Start Recording and added to the session")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Stream a recorded session (or manifest/merged file) instead of a device")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="Replay speed multiplier; 0 = as fast as possible")
+    parser.add_argument("--replay-original-timestamps", action="store_true",
+                        help="Keep recorded timestamps instead of shifting them to now")
+    parser.add_argument("--replay-autostart", action="store_true",
+                        help="Start recording when the replay connects and stop when it ends")
+    args, _ = parser.parse_known_args()
+    app = HRRecorderApp(profile_seconds=args.profile, benchmark_startup=args.benchmark_startup,
+                        marker_port=args.marker_port, segment_minutes=args.segment_minutes,
+                        segment_mb=args.segment_mb, segment_compression=args.segment_compression,
+                        continuous_capture=not args.no_continuous_capture,
+                        pretrigger_minutes=args.pretrigger_minutes, replay_path=args.replay,
+                        replay_speed=args.replay_speed,
+                        replay_original_timestamps=args.replay_original_timestamps,
+                        replay_autostart=args.replay_autostart)
     app.run()
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MARKER_PORT = 8765
+
+class MarkerServer:
+    """Local TCP API for adding event markers from other programs.
+
+    Line-based protocol on 127.0.0.1:
+        MARK <label>   -> OK <timestamp>   (or ERR <reason>)
+        PING           -> PONG
+
+    `on_marker(label, source)` is called on the app's event loop and returns
+    the stored marker dict, or None if no recording is active.
+    """
+
+    def __init__(self, on_marker, host="127.0.0.1", port=DEFAULT_MARKER_PORT):
+        self.on_marker = on_marker
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        logger.info(f"Marker API listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle_client(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, arg = line.decode("utf-8", errors="replace").strip().partition(" ")
+                command = command.upper()
+                if command == "MARK":
+                    marker = self.on_marker(arg.strip() or "marker", f"socket:{peer[1] if peer else '?'}")
+                    reply = f"OK {marker['timestamp']:.6f}" if marker else "ERR not recording"
+                elif command == "PING":
+                    reply = "PONG"
+                else:
+                    reply = f"ERR unknown command {command!r}"
+                writer.write((reply + "\n").encode("utf-8"))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
@@ -1,13 +1,31 @@
 import asyncio
-from bleak import BleakScanner
-from polar_python import PolarDevice
-from polar_python.models import HRData
 import logging
+import time
+from log_setup import RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+# Standard Battery Service (0x180F) Battery Level characteristic
+BATTERY_LEVEL_UUID = "00002a19-0000-1000-8000-00805f9b34fb"
+
+# bleak and polar_python (and bleak's platform backend) are imported lazily so
+# that the window can appear before they load. preload_ble_modules() is run on
+# a background thread after the first frame to warm them up.
+
+def preload_ble_modules():
+    """Imports the BLE stack ahead of first use."""
+    import bleak  # noqa: F401
+    import polar_python  # noqa: F401
+    try:
+        from bleak.backends.scanner import get_platform_scanner_backend_type
+        get_platform_scanner_backend_type()
+    except ImportError:
+        pass
 
 class PolarRecorder:
     def __init__(self):
         self.device = None
-        self.device_client: PolarDevice = None
+        self.device_client = None  # polar_python.PolarDevice
         self.is_connected = False
         self.hr_callback = None
         self.connected_name = None
@@ -17,6 +35,7 @@ class PolarRecorder:
 
     async def scan_devices(self):
         """Return list of devices with name and address."""
+        from bleak import BleakScanner
         devices = await BleakScanner.discover()
         results = []
         for d in devices:
@@ -31,7 +50,10 @@ class PolarRecorder:
         if not address:
             raise Exception("No device address provided")
 
-        print(f"Connecting to address {address}...")
+        from bleak import BleakScanner
+        from polar_python import PolarDevice
+
+        logger.info(f"Connecting to address {address}...")
         max_retries = 3
         target_device = None
 
@@ -65,55 +87,60 @@ class PolarRecorder:
                 self.is_connected = True
                 self.connected_name = target_device.name or "Unknown"
                 self.connected_address = target_device.address
-                print(f"Connected successfully to {self.connected_name} ({self.connected_address}).")
+                logger.info(f"Connected successfully to {self.connected_name} ({self.connected_address}).")
 
                 break
             except Exception as e:
-                print(f"Connection attempt {attempt + 1}/{max_retries} failed: {e}")
+                logger.warning(f"Connection attempt {attempt + 1}/{max_retries} failed: {e}")
                 if attempt == max_retries - 1:
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("Giving up connecting")
                     raise e
                 await asyncio.sleep(2.0)
 
         return self.connected_name
 
+    def now(self):
+        """Current time on the clock used for sample timestamps."""
+        return time.time()
+
     async def disconnect(self):
         if self.device_client and self.is_connected:
             try:
                 # Add timeout to disconnect to prevent hanging
                 await asyncio.wait_for(self.device_client.disconnect(), timeout=10.0)
             except asyncio.TimeoutError:
-                print("Disconnect timed out.")
+                logger.warning("Disconnect timed out.", extra=RATE_LIMITED)
             except Exception as e:
-                print(f"Error during disconnect: {e}")
+                logger.warning(f"Error during disconnect: {e}", extra=RATE_LIMITED)
             self.is_connected = False
             self.connected_name = None
             self.connected_address = None
             self.is_streaming = False
-            print("Disconnected.")
+            logger.info("Disconnected.")
 
     async def start_hr_stream(self, callback):
         """
         Starts HR streaming.
-        callback(hr_value: int, timestamp: float)
+        callback(timestamp: float, hr_value: int, rr_intervals: list)
         """
         self.hr_callback = callback
         
-        def internal_callback(data: HRData):
-            # HRData has 'heartrate' and 'rr_intervals'
+        def internal_callback(data):
+            # polar_python HRData has 'heartrate' and 'rr_intervals'
             
             hr_val = 0
+            rr_vals = []
             if hasattr(data, 'heartrate'):
                 hr_val = data.heartrate
+                rr_vals = getattr(data, 'rr_intervals', None) or []
             elif isinstance(data, dict) and 'heartrate' in data:
                 hr_val = data['heartrate']
+                rr_vals = data.get('rr_intervals') or []
             
             # Timestamp: We generate it here or use arrival time?
             # Arrival time is easiest for now.
-            import time
             if self.hr_callback:
-                self.hr_callback(time.time(), hr_val)
+                self.hr_callback(time.time(), hr_val, rr_vals)
 
         await self.device_client.start_hr_stream(internal_callback)
         self.is_streaming = True
@@ -124,11 +151,11 @@ class PolarRecorder:
                 await self.device_client.stop_hr_stream()
                 self.is_streaming = False
             except Exception as e:
-                print(f"Warning: Failed to stop HR stream gracefully: {e}")
+                logger.warning(f"Failed to stop HR stream gracefully: {e}", extra=RATE_LIMITED)
 
     def on_ble_disconnect(self, client):
         """Called by Bleak when device disconnects."""
-        print("BLE Disconnect detected in recorder")
+        logger.warning("BLE Disconnect detected in recorder", extra=RATE_LIMITED)
         self.is_connected = False
         self.is_streaming = False
 
@@ -144,17 +171,40 @@ class PolarRecorder:
             if client and client.is_connected:
                 # Add timeout to avoid hanging the entire app if BLE read stalls
                 battery_data = await asyncio.wait_for(
-                    client.read_gatt_char("00002a19-0000-1000-8000-00805f9b34fb"),
+                    client.read_gatt_char(BATTERY_LEVEL_UUID),
                     timeout=5.0
                 )
                 if battery_data:
                     return int(battery_data[0])
         except asyncio.TimeoutError:
-            print("Timeout fetching battery level.")
+            logger.warning("Timeout fetching battery level.", extra=RATE_LIMITED)
         except Exception as e:
             # We don't want to spam logs if it's a transient disconnection error
             if self.is_connected:
-                print(f"Error fetching battery level: {e}")
+                logger.warning(f"Error fetching battery level: {e}", extra=RATE_LIMITED)
         return None
 
+    async def start_battery_notify(self, callback):
+        """Subscribes to Battery Level notifications if the device supports them.
+
+        callback(level: int) is called on each notification. Returns True if subscribed.
+        """
+        client = getattr(self.device_client, 'client', None)
+        if not self.is_connected or not client or not client.is_connected:
+            return False
+
+        def on_notify(_, data):
+            if data:
+                callback(int(data[0]))
+
+        try:
+            char = client.services.get_characteristic(BATTERY_LEVEL_UUID)
+            if char is None or "notify" not in char.properties:
+                return False
+            await asyncio.wait_for(client.start_notify(char, on_notify), timeout=5.0)
+            return True
+        except Exception as e:
+            logger.info(f"Battery notifications unavailable, falling back to polling: {e}")
+            return False
+
 
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import time
+from session_reader import SessionReader
+
+logger = logging.getLogger(__name__)
+
+REPLAY_ADDRESS = "REPLAY"
+
+class ReplayRecorder:
+    """Drop-in stand-in for PolarRecorder that streams a recorded session.
+
+    Any file SessionReader accepts (plain, compressed, segment manifest or
+    merged) is fed to the same `callback(timestamp, hr, rr_intervals)` as a
+    live device, so the whole app pipeline can be exercised without hardware.
+
+    speed: 1.0 = real time, N = N times faster, 0 = as fast as possible.
+    Pacing is anchored to the recorded timestamps (no drift accumulates).
+    Timestamps are shifted to start at the current time unless
+    `original_timestamps` is set. When the file is exhausted the "device"
+    disconnects, like a sensor going out of range, and cannot be reconnected.
+    now() follows the replay clock so markers line up with replayed samples.
+    """
+
+    MAX_SPEED_BATCH = 200  # samples between yields to the event loop at max speed
+
+    def __init__(self, path, speed=1.0, original_timestamps=False):
+        self.path = path
+        self.speed = speed
+        self.original_timestamps = original_timestamps
+        self.reader = None
+        self.position = 0
+        self.stream_task = None
+        self.hr_callback = None
+        self.is_connected = False
+        self.is_streaming = False
+        self.finished = False
+        self.connected_name = None
+        self.connected_address = None
+        self.samples_sent = 0
+        self.stream_started = None
+        # Replay clock: replayed time = clock_ts + (monotonic - clock_anchor) * speed
+        self.clock_ts = None
+        self.clock_anchor = None
+        self.last_timestamp = None
+
+    @property
+    def device_name(self):
+        return f"Replay {os.path.basename(self.path)}"
+
+    async def scan_devices(self):
+        return [{"name": self.device_name, "address": REPLAY_ADDRESS, "device": None}]
+
+    async def connect_to_address(self, address):
+        if self.reader is None:
+            # Loading can take a while for large sessions; keep the UI responsive
+            self.reader = await asyncio.get_running_loop().run_in_executor(None, SessionReader, self.path)
+            logger.info(f"Replay loaded {len(self.reader)} samples from {self.path}")
+        if self.finished:
+            raise Exception("Replay finished; restart the app to replay again")
+        self.is_connected = True
+        self.connected_name = self.device_name
+        self.connected_address = REPLAY_ADDRESS
+        return self.connected_name
+
+    async def disconnect(self):
+        await self.stop_hr_stream()
+        self.is_connected = False
+        self.connected_name = None
+        self.connected_address = None
+
+    async def start_hr_stream(self, callback):
+        self.hr_callback = callback
+        if self.stream_task is None or self.stream_task.done():
+            self.stream_task = asyncio.get_running_loop().create_task(self._stream())
+        self.is_streaming = True
+
+    async def stop_hr_stream(self):
+        if self.stream_task and not self.stream_task.done():
+            self.stream_task.cancel()
+            try:
+                await self.stream_task
+            except asyncio.CancelledError:
+                pass
+        self.stream_task = None
+        self.is_streaming = False
+
+    def now(self):
+        """Current time on the replay clock (falls back to wall time before streaming)."""
+        if self.clock_ts is None:
+            if self.original_timestamps and self.reader is not None and len(self.reader):
+                return self.reader.records[self.position]["timestamp"]  # stands at the next sample
+            return time.time()
+        if self.speed > 0 and self.is_streaming and not self.finished:
+            return self.clock_ts + (time.monotonic() - self.clock_anchor) * self.speed
+        # Max speed or stopped: the clock stands at the last replayed sample
+        return self.last_timestamp if self.last_timestamp is not None else self.clock_ts
+
+    async def get_battery_level(self):
+        return None
+
+    async def start_battery_notify(self, callback):
+        return False
+
+    def on_ble_disconnect(self, client):
+        self.is_connected = False
+        self.is_streaming = False
+
+    async def _stream(self):
+        records = self.reader.records
+        if self.position >= len(records):
+            return
+        first_ts = records[self.position]["timestamp"]
+        offset = 0 if self.original_timestamps else time.time() - first_ts
+        anchor = time.monotonic()
+        self.stream_started = anchor
+        self.clock_ts = first_ts + offset
+        self.clock_anchor = anchor
+        sent_at_start = self.samples_sent
+
+        while self.position < len(records):
+            record = records[self.position]
+            if self.speed > 0:
+                delay = anchor + (record["timestamp"] - first_ts) / self.speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif self.position % self.MAX_SPEED_BATCH == 0:
+                await asyncio.sleep(0)
+            self.last_timestamp = record["timestamp"] + offset
+            if self.hr_callback:
+                self.hr_callback(self.last_timestamp, record.get("hr", 0), record.get("rr", []))
+            self.position += 1
+            self.samples_sent += 1
+
+        elapsed = time.monotonic() - anchor
+        sent = self.samples_sent - sent_at_start
+        recorded_span = records[-1]["timestamp"] - first_ts
+        logger.info(
+            f"Replay finished: {sent} samples in {elapsed:.2f}s "
+            f"({sent / elapsed if elapsed else float('inf'):.0f} samples/s, "
+            f"{recorded_span / elapsed if elapsed else float('inf'):.1f}x real time)"
+        )
+        self.finished = True
+        self.on_ble_disconnect(None)
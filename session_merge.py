@@ -0,0 +1,254 @@
+"""Merge the session files of one subject/device into a single time-ordered series.
+
+Reconnects and app restarts can leave one logical session spread over several
+`sub-..._time-....json` files (plus segments), with gaps and occasional
+overlapping duplicates. This combines them with a k-way streaming merge:
+
+    python session_merge.py SUBJECT [--device AA:BB:..] [--start 2025-12-15T09:00] [--end ...]
+
+Each input is read one segment at a time and the output is written
+incrementally, so memory is bounded by one segment per input rather than the
+total size of the data.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from data_manager import open_session_file, resolve_segment_path
+
+logger = logging.getLogger(__name__)
+
+SESSION_RE = re.compile(
+    r"^sub-(?P<subject>.+?)_date-(?P<date>\d{8})_time-(?P<time>\d{6})"
+    r"(?P<part>_manifest|_seg-\d+)?\.json(\.gz|\.xz)?$"
+)
+
+DEFAULT_GAP_SEC = 30
+
+
+def find_sessions(directory, subject):
+    """Returns one source per recorded session of `subject`, oldest first.
+
+    A source is a dict with `name`, the segment paths in order, and the
+    manifest if the session has one.
+    """
+    sessions = {}
+    for name in os.listdir(directory):
+        match = SESSION_RE.match(name)
+        if not match or match.group("subject") != subject:
+            continue
+        key = (match.group("date"), match.group("time"))
+        session = sessions.setdefault(key, {"name": f"sub-{subject}_date-{key[0]}_time-{key[1]}",
+                                            "manifest": None, "files": []})
+        if match.group("part") == "_manifest":
+            session["manifest"] = os.path.join(directory, name)
+        else:
+            session["files"].append(os.path.join(directory, name))
+
+    sources = []
+    for key in sorted(sessions):
+        session = sessions[key]
+        if session["manifest"]:
+            manifest = open_session_file(session["manifest"])
+            session["metadata"] = {k: v for k, v in manifest.items() if k != "segments"}
+            session["segments"] = manifest["segments"]
+            session["files"] = [resolve_segment_path(os.path.join(directory, s["file"]))
+                                for s in manifest["segments"]]
+        else:
+            # No manifest (older sessions): base file sorts before _seg-NNN files
+            session["files"].sort()
+            session["metadata"] = None
+            session["segments"] = None
+        sources.append(session)
+    return sources
+
+
+def iter_session(source, device_address=None, start=None, end=None, markers=None):
+    """Yields the records of one session in time order, loading one segment at a time.
+
+    Markers found along the way are appended to `markers`.
+    """
+    metadata = source["metadata"]
+    if metadata and device_address and metadata.get("device_address") != device_address:
+        return
+
+    for i, path in enumerate(source["files"]):
+        segment = source["segments"][i] if source["segments"] else None
+        if segment:
+            if not segment["count"] and not os.path.exists(path):
+                continue
+            # Skip whole segments outside the requested range without loading them
+            if segment["start"] is not None and (
+                (end is not None and segment["start"] > end) or (start is not None and segment["end"] < start)
+            ):
+                continue
+        data = open_session_file(path)
+        if device_address and data.get("device_address") != device_address:
+            return
+        if source["metadata"] is None:
+            source["metadata"] = {k: v for k, v in data.items() if k not in ("data", "markers")}
+        if markers is not None:
+            markers.extend(m for m in data.get("markers", [])
+                           if (start is None or m["timestamp"] >= start) and (end is None or m["timestamp"] <= end))
+        for record in data.get("data", []):
+            ts = record["timestamp"]
+            if start is not None and ts < start:
+                continue
+            if end is not None and ts > end:
+                return
+            source["used"] = True
+            yield record
+
+
+def merge_records(streams, tolerance=0.5, gap_sec=DEFAULT_GAP_SEC, gaps=None, stats=None):
+    """k-way merges time-ordered record streams, dropping duplicates.
+
+    Records within `tolerance` seconds of the first record of a run are
+    duplicates; of those, the one with the higher `quality` is kept. The
+    window is anchored to that first record, so a run can't chain past it. Breaks
+    longer than `gap_sec` are appended to `gaps` as {start, end, duration_sec}.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("duplicates", 0)
+    pending = None
+    anchor_ts = None  # timestamp of the first record of the current duplicate run
+    last_ts = None
+    for record in heapq.merge(*streams, key=lambda r: r["timestamp"]):
+        if pending is not None and record["timestamp"] - anchor_ts <= tolerance:
+            stats["duplicates"] += 1
+            if record.get("quality", 1.0) > pending.get("quality", 1.0):
+                pending = record
+            continue
+        if pending is not None:
+            if last_ts is not None and gaps is not None and pending["timestamp"] - last_ts > gap_sec:
+                gaps.append(_gap(last_ts, pending["timestamp"]))
+            last_ts = pending["timestamp"]
+            yield pending
+        pending = record
+        anchor_ts = record["timestamp"]
+    if pending is not None:
+        if last_ts is not None and gaps is not None and pending["timestamp"] - last_ts > gap_sec:
+            gaps.append(_gap(last_ts, pending["timestamp"]))
+        yield pending
+
+
+def _gap(start, end):
+    return {
+        "start": start,
+        "end": end,
+        "start_datetime": datetime.fromtimestamp(start).isoformat(),
+        "duration_sec": round(end - start, 3),
+    }
+
+
+def merge_sessions(directory, subject, device_address=None, start=None, end=None,
+                   tolerance=0.5, gap_sec=None, output=None):
+    """Merges every session of `subject` (optionally one device and time range) into `output`.
+
+    `start`/`end` are epoch seconds. The output is a regular session file
+    (readable by SessionReader) with extra `merged_from` and `gaps` fields.
+    Returns a summary dict.
+    """
+    sources = find_sessions(directory, subject)
+    if not sources:
+        raise FileNotFoundError(f"No sessions for subject '{subject}' in {directory}")
+
+    if gap_sec is None:
+        intervals = [s["metadata"].get("sampling_interval_sec") for s in sources if s["metadata"]]
+        gap_sec = max(3 * max([i for i in intervals if i] or [0]), DEFAULT_GAP_SEC)
+
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(directory, f"sub-{subject}_merged_{stamp}.json")
+
+    markers = []
+    gaps = []
+    stats = {}
+    streams = [iter_session(s, device_address, start, end, markers) for s in sources]
+
+    header = {
+        "subject": subject,
+        "device_address": device_address,
+        "dedup_tolerance_sec": tolerance,
+        "gap_threshold_sec": gap_sec,
+    }
+    count = 0
+    pending_markers = []
+    written_markers = []
+    seen_markers = set()
+    sequence = itertools.count()
+
+    def queue_markers():
+        # Markers are collected as segments load; duplicates from overlapping files are dropped
+        for marker in markers:
+            key = (marker["timestamp"], marker.get("label"))
+            if key not in seen_markers:
+                seen_markers.add(key)
+                heapq.heappush(pending_markers, (marker["timestamp"], next(sequence), marker))
+        markers.clear()
+
+    tmp_output = output + ".tmp"
+    with open(tmp_output, 'w') as f:
+        f.write(json.dumps(header)[:-1] + ', "data": [')
+        for record in merge_records(streams, tolerance, gap_sec, gaps, stats):
+            queue_markers()
+            # Each marker is indexed to the first merged sample at or after it
+            while pending_markers and pending_markers[0][0] <= record["timestamp"]:
+                written_markers.append(dict(heapq.heappop(pending_markers)[2], index=count))
+            f.write(("," if count else "") + "\n" + json.dumps(record))
+            count += 1
+        queue_markers()
+        while pending_markers:
+            written_markers.append(dict(heapq.heappop(pending_markers)[2], index=count))
+        # Written after the data since only now do we know which sessions contributed
+        merged_from = [s["name"] for s in sources if s.get("used")]
+        f.write('\n], "merged_from": ' + json.dumps(merged_from) + ', "gaps": ' + json.dumps(gaps)
+                + ', "markers": ' + json.dumps(written_markers) + "}\n")
+    os.replace(tmp_output, output)
+
+    summary = {
+        "output": output,
+        "sources": len(merged_from),
+        "count": count,
+        "duplicates": stats["duplicates"],
+        "gaps": len(gaps),
+        "markers": len(written_markers),
+    }
+    logger.info(f"Merged sessions: {summary}")
+    return summary
+
+
+def _parse_time(value):
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("subject", help="Subject ID as used in the file names")
+    parser.add_argument("--dir", default=os.path.join(os.path.expanduser("~/Documents"), "HRRecorder"),
+                        help="Directory containing session files")
+    parser.add_argument("--device", help="Only merge sessions from this device address")
+    parser.add_argument("--start", type=_parse_time, help="ISO datetime or epoch seconds")
+    parser.add_argument("--end", type=_parse_time, help="ISO datetime or epoch seconds")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Samples closer than this many seconds are duplicates")
+    parser.add_argument("--gap-sec", type=float,
+                        help="Breaks longer than this are recorded as gaps (default: 3x sampling interval, min 30)")
+    parser.add_argument("-o", "--output", help="Output file (default: sub-SUBJECT_merged_<now>.json in --dir)")
+    args = parser.parse_args()
+
+    summary = merge_sessions(args.dir, args.subject, args.device, args.start, args.end,
+                             args.tolerance, args.gap_sec, args.output)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
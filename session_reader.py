@@ -0,0 +1,85 @@
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from data_manager import open_session_file, resolve_segment_path
+
+class SessionReader:
+    """Read-only view of a recorded session.
+
+    `path` may be a single session file (plain, .gz or .xz) or a segment
+    manifest, in which case all segments are read in order as one stream and
+    marker indices are offset to match.
+
+    Timestamps and HR values are held in parallel `array('d')` columns sorted
+    by time, so time-range queries are binary searches plus a slice rather
+    than a scan over every record.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        session = open_session_file(path)
+
+        if "segments" in session:
+            self.records = []
+            self.markers = []
+            base_dir = os.path.dirname(path)
+            for segment in session["segments"]:
+                segment_path = resolve_segment_path(os.path.join(base_dir, segment["file"]))
+                if not segment["count"] and not os.path.exists(segment_path):
+                    continue  # started by a rollover but nothing saved to it yet
+                segment_data = open_session_file(segment_path)
+                offset = len(self.records)
+                self.records.extend(segment_data.get("data", []))
+                for marker in segment_data.get("markers", []):
+                    if marker.get("index") is not None:
+                        marker["index"] += offset
+                    self.markers.append(marker)
+            self.segments = session.pop("segments")
+        else:
+            self.records = session.pop("data", [])
+            self.markers = session.pop("markers", [])
+            self.segments = None
+        self.metadata = session
+
+        self.timestamps = array('d', (r["timestamp"] for r in self.records))
+        self.hr = array('d', (r["hr"] for r in self.records))
+
+    def __len__(self):
+        return len(self.records)
+
+    def index_range(self, start, end):
+        """Returns (lo, hi) such that timestamps[lo:hi] lie in [start, end]."""
+        return bisect_left(self.timestamps, start), bisect_right(self.timestamps, end)
+
+    def hr_between(self, start, end):
+        """Returns (timestamps, hr) arrays for samples in [start, end]."""
+        lo, hi = self.index_range(start, end)
+        return self.timestamps[lo:hi], self.hr[lo:hi]
+
+    def get_markers(self, label=None):
+        if label is None:
+            return list(self.markers)
+        return [m for m in self.markers if m["label"] == label]
+
+    def _index_matches(self, index, timestamp):
+        """True if `index` is the first sample at or after `timestamp`."""
+        if index < 0 or index > len(self.timestamps):
+            return False
+        if index > 0 and self.timestamps[index - 1] >= timestamp:
+            return False
+        return index == len(self.timestamps) or self.timestamps[index] >= timestamp
+
+    def after_markers(self, seconds, label=None):
+        """HR in the `seconds` after each marker.
+
+        Returns a list of (marker, timestamps, hr). The stored marker index is
+        used as the slice start, so only the end needs a binary search.
+        """
+        windows = []
+        for marker in self.get_markers(label):
+            lo = marker.get("index")
+            if lo is None or not self._index_matches(lo, marker["timestamp"]):
+                lo = bisect_left(self.timestamps, marker["timestamp"])
+            hi = bisect_right(self.timestamps, marker["timestamp"] + seconds, lo)
+            windows.append((marker, self.timestamps[lo:hi], self.hr[lo:hi]))
+        return windows
@@ -0,0 +1,114 @@
+from collections import deque
+
+# Plausible human heart rate range (bpm)
+HR_MIN = 25
+HR_MAX = 240
+
+class SignalQuality:
+    """Streaming artifact detection and quality scoring for HR/RR samples.
+
+    Each call to assess() does a fixed amount of work (the rolling windows
+    have a fixed size), so the cost per sample is O(1):
+    - dropout: missing/zero HR, or a gap between samples longer than `gap_sec`
+    - outlier: HR outside the physiological range, or more than `mad_k` scaled
+      MADs from the rolling median
+    - flatline: the same HR repeated for `flatline_count` samples in a row
+    - ectopic: RR intervals deviating more than `ectopic_pct` from the rolling
+      RR median; they are replaced by that median in the returned `rr`
+
+    Flagged values still enter the rolling windows (except physiologically
+    impossible HR), so an isolated artifact barely moves the median while a
+    lasting change in level is accepted after about half a window.
+    """
+
+    def __init__(self, window=15, mad_k=4.0, min_mad=2.0, flatline_count=30,
+                 gap_sec=5.0, rr_window=11, ectopic_pct=0.2):
+        self.window = deque(maxlen=window)
+        self.mad_k = mad_k
+        self.min_mad = min_mad
+        self.flatline_count = flatline_count
+        self.gap_sec = gap_sec
+        self.rr_window = deque(maxlen=rr_window)
+        self.ectopic_pct = ectopic_pct
+        self.reset()
+
+    def reset(self):
+        self.window.clear()
+        self.rr_window.clear()
+        self.last_timestamp = None
+        self.last_hr = None
+        self.repeat_count = 0
+        self.score = 1.0  # exponentially weighted recent quality, for the UI
+        self.flags = []   # flags of the most recent sample
+
+    @staticmethod
+    def _median(values):
+        ordered = sorted(values)
+        mid = len(ordered) // 2
+        if len(ordered) % 2:
+            return ordered[mid]
+        return (ordered[mid - 1] + ordered[mid]) / 2
+
+    def assess(self, timestamp, hr, rr_intervals=None):
+        """Scores one sample.
+
+        Returns a dict with `quality` (0-1), `flags` (list of str) and `rr`
+        (RR intervals in ms with ectopic beats corrected).
+        """
+        flags = []
+        quality = 1.0
+
+        if self.last_timestamp is not None and timestamp - self.last_timestamp > self.gap_sec:
+            flags.append("gap")
+            quality = min(quality, 0.5)
+        self.last_timestamp = timestamp
+
+        if not hr:
+            flags.append("dropout")
+            quality = 0.0
+        else:
+            if hr == self.last_hr:
+                self.repeat_count += 1
+            else:
+                self.repeat_count = 1
+            self.last_hr = hr
+            if self.repeat_count >= self.flatline_count:
+                flags.append("flatline")
+                quality = min(quality, 0.3)
+
+            if hr < HR_MIN or hr > HR_MAX:
+                flags.append("outlier")
+                quality = min(quality, 0.1)
+            elif len(self.window) >= self.window.maxlen // 2:
+                median = self._median(self.window)
+                mad = self._median([abs(v - median) for v in self.window]) * 1.4826
+                if abs(hr - median) > self.mad_k * max(mad, self.min_mad):
+                    flags.append("outlier")
+                    quality = min(quality, 0.2)
+
+            # Flagged values still enter the window: a lone spike can't move the
+            # median, but a lasting change in level takes over after window/2 samples
+            if HR_MIN <= hr <= HR_MAX:
+                self.window.append(hr)
+
+        corrected = []
+        ectopic = 0
+        for rr in rr_intervals or []:
+            if len(self.rr_window) >= 3:
+                rr_median = self._median(self.rr_window)
+                if abs(rr - rr_median) > self.ectopic_pct * rr_median:
+                    ectopic += 1
+                    corrected.append(rr_median)
+                else:
+                    corrected.append(rr)
+            else:
+                corrected.append(rr)
+            # Raw value enters the window either way so a sustained rate change is followed
+            self.rr_window.append(rr)
+        if ectopic:
+            flags.append("ectopic")
+            quality = min(quality, 1.0 - 0.5 * ectopic / len(corrected))
+
+        self.score = 0.9 * self.score + 0.1 * quality
+        self.flags = flags
+        return {"quality": round(quality, 2), "flags": flags, "rr": corrected}